@@ -4,6 +4,9 @@ import requests
 from sentence_transformers import SentenceTransformer, util
 import os # 파일 존재 여부 확인을 위해 추가
 import json # Firebase config 파싱을 위해 추가
+import sys # 세션 메모리 추정을 위해 추가
+import time # 세션 유휴 시간 계산을 위해 추가
+import threading # 세션 레지스트리 동기화를 위해 추가
 import firebase_admin
 
 # Firebase 관련 import
@@ -19,6 +22,14 @@ except ImportError:
     st.warning("Firebase Admin SDK를 찾을 수 없습니다. Firebase 기능 없이 앱이 실행됩니다.")
     FIREBASE_AVAILABLE = False
 
+# 세션 식별 및 종료된 세션 확인에 사용합니다. (Streamlit 내부 API이므로 없으면 기능을 끕니다)
+try:
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    SESSION_TRACKING_AVAILABLE = True
+except ImportError:
+    SESSION_TRACKING_AVAILABLE = False
+
 
 # --- API 및 모델 설정 ---
 
@@ -36,8 +47,24 @@ except KeyError:
     st.info("임시 Google API Key로 작동합니다. 일부 기능이 제한될 수 있습니다.")
 
 
+def get_config_value(name, default):
+    """st.secrets에 설정된 값을 기본값의 타입으로 읽고, 없으면 기본값을 사용합니다."""
+    try:
+        return type(default)(st.secrets[name])
+    except (KeyError, FileNotFoundError, TypeError, ValueError): # 설정이 없거나 형식이 잘못된 경우
+        return default
+
+
 HINT_THRESHOLD = 0.4  # 이 유사도 이상일 때 힌트를 제공합니다.
 WORDS_FILE = "words.txt" # 영단어 목록 파일 이름
+API_CACHE_TTL_SECONDS = 3600 # 사전/번역 API 결과와 단어 임베딩을 세션 간에 공유하는 시간
+WORD_CACHE_MAX_ENTRIES = 256 # 세션 간에 공유하는 단어별 뜻/번역/임베딩 캐시의 최대 단어 수
+
+# 세션 메모리 관리 설정 (st.secrets로 덮어쓸 수 있습니다)
+SESSION_IDLE_TIMEOUT_SECONDS = get_config_value("SESSION_IDLE_TIMEOUT_SECONDS", 600) # 이 시간 동안 상호작용이 없으면 파생 상태를 비웁니다.
+SESSION_MEMORY_BUDGET_MB = get_config_value("SESSION_MEMORY_BUDGET_MB", 256.0) # 전체 세션 메모리 예산
+# 세션 간에 공유되는 객체라서 세션별 메모리에 포함하지 않는 키
+SESSION_UNTRACKED_KEYS = ["all_words", "db", "auth"]
 
 @st.cache_resource
 def load_sbert_model():
@@ -373,10 +400,20 @@ def logout_user():
 def load_words_from_file(filepath):
     """
     지정된 파일에서 영단어 목록을 불러옵니다.
-    각 줄의 공백을 제거하고 소문자로 변환합니다.
+    파일의 수정 시각을 캐시 키에 포함하므로, 파일을 고치거나 새로 만들면 다음 호출에서 다시 읽습니다.
+    """
+    mtime = os.path.getmtime(filepath) if os.path.exists(filepath) else None
+    return read_words_file(filepath, mtime)
+
+@st.cache_resource(max_entries=4)
+def read_words_file(filepath, mtime):
+    """
+    파일에서 영단어 목록을 읽습니다. 각 줄의 공백을 제거하고 소문자로 변환합니다.
+    모든 세션이 같은 목록 객체를 공유하도록 @st.cache_resource를 사용하고, 수정할 수 없도록 튜플로 반환합니다.
+    (@st.cache_data는 호출할 때마다 복사본을 돌려주므로 세션마다 목록이 하나씩 더 생깁니다)
     """
     words = []
-    if os.path.exists(filepath):
+    if mtime is not None:
         with open(filepath, 'r', encoding='utf-8') as f:
             for line in f:
                 word = line.strip().lower() # 공백 제거 및 소문자 변환
@@ -390,40 +427,59 @@ def load_words_from_file(filepath):
         st.error(f"'{filepath}' 파일을 찾을 수 없습니다. 파일을 생성하고 영단어를 한 줄에 하나씩 입력해주세요.")
         # 파일이 없을 경우 기본 단어 목록을 제공 (개발/테스트용)
         words = ["happy", "sad", "angry", "joyful", "unhappy", "glad", "mad", "furious", "beautiful", "intelligent", "courageous", "brave", "kind", "gentle", "strong", "weak", "fast", "slow", "bright", "dark"]
-    return words
+    return tuple(words)
 
-def get_word_data(word):
-    """단어의 첫 번째 뜻과 유의어 목록을 가져오는 함수"""
+@st.cache_data(ttl=API_CACHE_TTL_SECONDS)
+def fetch_word_data(word):
+    """
+    사전 API에서 단어의 첫 번째 뜻과 유의어 목록을 가져옵니다.
+    실패하면 예외를 던지므로 성공한 응답만 캐시됩니다.
+    """
     url = f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
     definition, synonyms = None, []
+    response = requests.get(url)
+    if response.status_code != 200:
+        raise requests.exceptions.HTTPError(f"상태 코드: {response.status_code}, 응답: {response.text}")
+    data = response.json()
+    for meaning in data[0].get('meanings', []):
+        if not definition and meaning.get('definitions'):
+            definition = meaning['definitions'][0].get('definition')
+        synonyms.extend(s for s in meaning.get('synonyms', []) if s not in synonyms)
+    return definition, synonyms
+
+def get_word_data(word):
+    """단어의 첫 번째 뜻과 유의어 목록을 가져오는 함수"""
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            for meaning in data[0].get('meanings', []):
-                if not definition and meaning.get('definitions'):
-                    definition = meaning['definitions'][0].get('definition')
-                synonyms.extend(s for s in meaning.get('synonyms', []) if s not in synonyms)
-        else:
-            # API 호출 실패 시 디버깅 정보 출력
-            st.warning(f"단어 '{word}'의 정의를 가져오지 못했습니다. 상태 코드: {response.status_code}, 응답: {response.text}")
+        return fetch_word_data(word)
+    except requests.exceptions.HTTPError as e:
+        # API 호출 실패 시 디버깅 정보 출력
+        st.warning(f"단어 '{word}'의 정의를 가져오지 못했습니다. {e}")
+        return None, []
     except requests.exceptions.RequestException as e:
         st.error(f"API 요청 중 오류 발생: {e}")
         return "API 요청 중 오류 발생", []
-    return definition, synonyms
+
+@st.cache_data(ttl=API_CACHE_TTL_SECONDS)
+def fetch_translation(text):
+    """
+    Google Translate API로 영어 텍스트를 한국어로 번역합니다.
+    실패하면 예외를 던지므로 성공한 응답만 캐시됩니다.
+    """
+    url = "https://translation.googleapis.com/language/translate/v2"
+    params = {'q': text, 'source': 'en', 'target': 'ko', 'format': 'text', 'key': GOOGLE_API_KEY}
+    res = requests.post(url, params=params)
+    if res.status_code != 200:
+        raise requests.exceptions.HTTPError(f"{res.status_code} - {res.text}")
+    return res.json()['data']['translations'][0]['translatedText']
 
 def translate_to_korean(text):
     """Google Translate API를 사용하여 영어 텍스트를 한국어로 번역하는 함수"""
     if not text: return "번역할 내용 없음"
-    url = "https://translation.googleapis.com/language/translate/v2"
-    params = {'q': text, 'source': 'en', 'target': 'ko', 'format': 'text', 'key': GOOGLE_API_KEY}
     try:
-        res = requests.post(url, params=params)
-        if res.status_code == 200:
-            return res.json()['data']['translations'][0]['translatedText']
-        else:
-            st.error(f"번역 API 오류: {res.status_code} - {res.text}")
-            return "번역 실패"
+        return fetch_translation(text)
+    except requests.exceptions.HTTPError as e:
+        st.error(f"번역 API 오류: {e}")
+        return "번역 실패"
     except requests.exceptions.RequestException as e:
         st.error(f"번역 API 요청 중 오류 발생: {e}")
         return "번역 API 요청 중 오류 발생"
@@ -484,6 +540,68 @@ def sort_by_quiz_correct_order(all_words, correctly_answered_words_in_order):
     
     return sorted_correct + unanswered_words
 
+def sort_words_for_display(sort_order):
+    """
+    사용자가 선택한 정렬 방식으로 단어 목록 페이지에 표시할 목록을 만듭니다.
+    """
+    if sort_order == "length":
+        return sort_by_length(list(st.session_state.all_words))
+    if sort_order == "quiz_correct":
+        return sort_by_quiz_correct_order(
+            list(st.session_state.all_words), 
+            st.session_state.correctly_answered_words_in_order
+        )
+    return merge_sort(list(st.session_state.all_words))
+
+
+def build_word_state(word, first_def, synonyms, translated_def):
+    """단어의 뜻, 번역, 힌트용 유의어와 임베딩을 퀴즈 화면에서 쓰는 형태로 묶습니다."""
+    # 힌트 제공을 위한 유의어 목록 (정답으로 인정되지 않음)
+    synonyms_for_hints = [s.lower() for s in synonyms if s.lower() != word.lower()]
+    
+    # 정답 단어 및 힌트 단어들의 임베딩을 미리 계산하여 저장
+    words_to_embed_for_similarity = [word] + synonyms_for_hints
+    return {
+        'word': word,
+        'first_def': first_def,
+        'translated_def': translated_def,
+        'synonyms_for_hints': synonyms_for_hints,
+        'embeddings_for_similarity': model.encode(words_to_embed_for_similarity),
+    }
+
+@st.cache_resource(ttl=API_CACHE_TTL_SECONDS, max_entries=WORD_CACHE_MAX_ENTRIES)
+def load_word_state(word):
+    """
+    단어별 퀴즈 데이터를 계산합니다. @st.cache_resource 덕분에 같은 단어는 모든 세션이 하나의 객체를 공유하고,
+    max_entries/ttl에 따라 Streamlit이 메모리에서 내립니다. API가 실패하면 예외를 던지므로 캐시되지 않습니다.
+    """
+    first_def, synonyms = fetch_word_data(word)
+    translated_def = fetch_translation(first_def) if first_def else "번역할 내용 없음"
+    return build_word_state(word, first_def, synonyms, translated_def)
+
+def get_word_state(word):
+    """
+    현재 단어의 뜻, 번역, 힌트용 유의어와 임베딩을 반환합니다.
+    API가 실패하면 오류를 표시하고, 대체 데이터를 이 세션의 파생 상태에만 보관해 매 실행마다 재요청하지 않도록 합니다.
+    """
+    failed_state = get_session_derived('failed_word_state')
+    if failed_state is not None and failed_state['word'] == word:
+        return failed_state
+    try:
+        return load_word_state(word)
+    except requests.exceptions.RequestException:
+        first_def, synonyms = get_word_data(word)
+        failed_state = build_word_state(word, first_def, synonyms, translate_to_korean(first_def))
+        set_session_derived('failed_word_state', failed_state)
+        return failed_state
+
+def get_display_words():
+    """단어 목록 페이지의 표시 목록을 반환합니다. 정리되었다면 사용자가 선택한 정렬 방식으로 다시 만듭니다."""
+    display_words = get_session_derived('display_words')
+    if display_words is None:
+        display_words = sort_words_for_display(st.session_state.current_sort_order)
+        set_session_derived('display_words', display_words)
+    return display_words
 
 def load_new_word():
     """새 단어를 불러오고 모든 관련 상태를 초기화하는 함수"""
@@ -501,16 +619,7 @@ def load_new_word():
     st.session_state.available_words.remove(new_word)
     st.session_state.used_words.append(new_word) 
     
-    first_def, synonyms_for_hints = get_word_data(new_word)
-    st.session_state.first_def = first_def
-    st.session_state.translated_def = translate_to_korean(first_def)
-    
-    # 힌트 제공을 위한 유의어 목록 (정답으로 인정되지 않음)
-    st.session_state.synonyms_for_hints = [s.lower() for s in synonyms_for_hints if s.lower() != new_word.lower()]
-    
-    # 정답 단어 및 힌트 단어들의 임베딩을 미리 계산하여 저장
-    words_to_embed_for_similarity = [new_word] + st.session_state.synonyms_for_hints
-    st.session_state.embeddings_for_similarity = model.encode(words_to_embed_for_similarity)
+    get_word_state(new_word) # 뜻/번역/임베딩을 미리 계산 (공유 캐시에 저장됩니다)
     
     st.session_state.input_key = f"input_{random.randint(1, 1000000)}"
     st.session_state.answered_correctly = False
@@ -520,6 +629,129 @@ def load_new_word():
     if st.session_state.get('logged_in') and st.session_state.get('firebase_initialized') and st.session_state.get('user_id') and st.session_state.user_id not in ["loading_user", "not_authenticated", "firebase_init_error", "anonymous_user_error", "no_firebase_config", "firebase_not_available"]:
         save_user_session_data()
 
+# --- 세션 메모리 관리 함수 ---
+
+@st.cache_resource
+def get_session_registry():
+    """
+    모든 세션의 마지막 상호작용 시각, 메모리 사용량, 파생 상태를 기록하는 공유 레지스트리를 반환합니다.
+    @st.cache_resource 덕분에 앱 프로세스 전체에서 하나만 존재합니다.
+    파생 상태(표시용 목록 등)는 st.session_state가 아닌 이곳에 두어, 어느 세션의 스레드든 잠금을 잡고 비울 수 있습니다.
+    """
+    return {'lock': threading.Lock(), 'sessions': {}}
+
+def new_session_entry():
+    """레지스트리에 새로 등록할 세션 항목을 만듭니다."""
+    return {'last_active': time.time(), 'state_bytes': 0, 'derived': {}, 'derived_bytes': 0}
+
+def get_current_session_id():
+    """현재 실행 중인 세션의 ID를 반환합니다. 세션 정보를 얻을 수 없으면 None을 반환합니다."""
+    if not SESSION_TRACKING_AVAILABLE:
+        return None
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+def get_shared_word_ids():
+    """모든 세션이 공유하는 단어 목록(all_words)의 문자열 객체 ID를 반환합니다."""
+    return {id(word) for word in st.session_state.get('all_words', ())}
+
+def estimate_size(value, shared_ids):
+    """
+    객체가 차지하는 메모리(바이트)를 대략적으로 추정합니다. 컨테이너는 내부 요소까지 합산하되,
+    다른 세션과 공유하는 객체(shared_ids)는 세지 않습니다.
+    """
+    if id(value) in shared_ids:
+        return 0
+    if hasattr(value, 'nbytes'): # numpy 배열 (임베딩)
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, shared_ids) + estimate_size(v, shared_ids) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(estimate_size(v, shared_ids) for v in value)
+    return size
+
+def get_session_memory_bytes():
+    """현재 세션 상태가 차지하는 메모리를 추정합니다. (세션 간에 공유되는 객체는 제외)"""
+    shared_ids = get_shared_word_ids()
+    return sum(estimate_size(value, shared_ids) for key, value in st.session_state.to_dict().items() if key not in SESSION_UNTRACKED_KEYS)
+
+def get_session_derived(key):
+    """현재 세션의 파생 상태를 반환합니다. 정리되었거나 아직 없으면 None을 반환합니다."""
+    session_id = get_current_session_id()
+    if session_id is None:
+        return st.session_state.get(key)
+    registry = get_session_registry()
+    with registry['lock']:
+        entry = registry['sessions'].get(session_id)
+        return entry['derived'].get(key) if entry is not None else None
+
+def set_session_derived(key, value):
+    """현재 세션의 파생 상태를 저장하고, 레지스트리의 파생 상태 메모리 사용량을 갱신합니다."""
+    session_id = get_current_session_id()
+    if session_id is None:
+        st.session_state[key] = value
+        return
+    shared_ids = get_shared_word_ids()
+    registry = get_session_registry()
+    with registry['lock']:
+        entry = registry['sessions'].setdefault(session_id, new_session_entry())
+        entry['derived'][key] = value
+        entry['derived_bytes'] = sum(estimate_size(v, shared_ids) for v in entry['derived'].values())
+
+def release_session_derived(entry):
+    """세션의 파생 상태를 비웁니다. 레지스트리 잠금을 잡은 상태에서 호출해야 합니다."""
+    entry['derived'].clear()
+    entry['derived_bytes'] = 0
+
+def is_session_alive(session_id):
+    """Streamlit 런타임이 아직 해당 세션을 유지하고 있는지 확인합니다. (탭이 닫히면 False)"""
+    if not Runtime.exists():
+        return True
+    return Runtime.instance().is_active_session(session_id)
+
+def track_session_memory():
+    """
+    현재 세션의 메모리 사용량을 레지스트리에 기록하고, 종료된 세션을 레지스트리에서 제거합니다.
+    유휴 시간이 지난 세션과, 실제 사용량이 예산을 초과하는 동안 가장 오래된 세션의 파생 상태를 바로 비웁니다.
+    비워진 파생 상태는 해당 세션이 다시 필요로 할 때 get_word_state/get_display_words에서 다시 만들어집니다.
+    """
+    registry = get_session_registry()
+    session_id = get_current_session_id()
+    if session_id is None:
+        return registry
+
+    now = time.time()
+    budget_bytes = SESSION_MEMORY_BUDGET_MB * 1024 * 1024
+    state_bytes = get_session_memory_bytes()
+    with registry['lock']:
+        sessions = registry['sessions']
+
+        # 1. 탭이 닫혀 런타임에서 사라진 세션 제거
+        for other_id in list(sessions):
+            if other_id != session_id and not is_session_alive(other_id):
+                del sessions[other_id]
+
+        entry = sessions.setdefault(session_id, new_session_entry())
+        entry['last_active'] = now
+        entry['state_bytes'] = state_bytes
+
+        # 2. 유휴 시간이 지난 세션의 파생 상태 정리
+        for other_id, info in sessions.items():
+            if other_id != session_id and now - info['last_active'] > SESSION_IDLE_TIMEOUT_SECONDS:
+                release_session_derived(info)
+
+        # 3. 실제 사용량이 예산을 초과하면 가장 오래 상호작용이 없었던 세션부터 파생 상태 정리
+        total_bytes = sum(info['state_bytes'] + info['derived_bytes'] for info in sessions.values())
+        for other_id, info in sorted(sessions.items(), key=lambda item: item[1]['last_active']):
+            if total_bytes <= budget_bytes:
+                break
+            if other_id == session_id:
+                continue
+            total_bytes -= info['derived_bytes']
+            release_session_derived(info)
+    return registry
+
 # --- Streamlit 앱 UI ---
 
 # 앱 초기 로딩 시 Firebase 초기화 및 사용자 데이터 로드
@@ -564,9 +796,10 @@ if page == "퀴즈":
     if not st.session_state.get('logged_in'):
         st.warning("로그인하거나 계정을 생성해야 퀴즈를 시작하고 학습 기록을 저장할 수 있습니다.")
     else:
+        word_state = get_word_state(st.session_state.current_word) # 공유 캐시에서 가져오거나 다시 계산
         st.subheader("힌트: 다음 뜻에 해당하는 영어 단어를 맞춰보세요.")
-        st.markdown(f"**영어 뜻:** `{st.session_state.first_def}`")
-        st.markdown(f"→ **한글 번역:** `{st.session_state.translated_def}`")
+        st.markdown(f"**영어 뜻:** `{word_state['first_def']}`")
+        st.markdown(f"→ **한글 번역:** `{word_state['translated_def']}`")
 
         if not st.session_state.get('answered_correctly', False):
             user_input = st.text_input("영어 단어를 입력하세요:", key=st.session_state.input_key)
@@ -598,11 +831,11 @@ if page == "퀴즈":
                         max_similarity = 0
                         
                         # 정답 단어와의 유사도 계산
-                        sim_with_main_word = util.cos_sim(st.session_state.embeddings_for_similarity[0], embedding_user).item()
+                        sim_with_main_word = util.cos_sim(word_state['embeddings_for_similarity'][0], embedding_user).item()
                         max_similarity = sim_with_main_word
 
                         # 힌트용 유의어들과의 유사도 계산 (가장 높은 유사도 선택)
-                        for i, syn_embedding in enumerate(st.session_state.embeddings_for_similarity[1:]):
+                        for i, syn_embedding in enumerate(word_state['embeddings_for_similarity'][1:]):
                             sim_with_syn = util.cos_sim(syn_embedding, embedding_user).item()
                             if sim_with_syn > max_similarity:
                                 max_similarity = sim_with_syn
@@ -623,8 +856,8 @@ if page == "퀴즈":
 
         if st.button("정답 공개", key="reveal_answer"):
             st.info(f"정답: **{st.session_state.current_word}**")
-            if st.session_state.synonyms_for_hints:
-                st.info(f"이 단어의 다른 유사 단어들 (힌트 목적으로 사용): `{', '.join(st.session_state.synonyms_for_hints)}`")
+            if word_state['synonyms_for_hints']:
+                st.info(f"이 단어의 다른 유사 단어들 (힌트 목적으로 사용): `{', '.join(word_state['synonyms_for_hints'])}`")
 
 elif page == "단어 목록":
     st.title("📚 단어 목록")
@@ -639,27 +872,36 @@ elif page == "단어 목록":
         # 기본 정렬 상태 (사전 순)
         if 'current_sort_order' not in st.session_state:
             st.session_state.current_sort_order = "alphabetical"
-            st.session_state.display_words = merge_sort(list(st.session_state.all_words))
+        # 표시 목록은 get_display_words에서 사용자가 선택한 정렬 방식으로 (다시) 만들어짐
 
         with col_sort1:
             if st.button("사전 순 정렬"):
                 st.session_state.current_sort_order = "alphabetical"
-                st.session_state.display_words = merge_sort(list(st.session_state.all_words))
+                set_session_derived('display_words', sort_words_for_display("alphabetical"))
         with col_sort2:
             if st.button("단어 길이 순 정렬"):
                 st.session_state.current_sort_order = "length"
-               
+                set_session_derived('display_words', sort_words_for_display("length"))
         with col_sort3:
             if st.button("퀴즈 맞춘 순 정렬"):
                 st.session_state.current_sort_order = "quiz_correct"
-                st.session_state.display_words = sort_by_quiz_correct_order(
-                    list(st.session_state.all_words), 
-                    st.session_state.correctly_answered_words_in_order
-                )
+                set_session_derived('display_words', sort_words_for_display("quiz_correct"))
         
         st.markdown(f"---")
         st.markdown(f"**현재 정렬 방식:** {'사전 순' if st.session_state.current_sort_order == 'alphabetical' else '단어 길이 순' if st.session_state.current_sort_order == 'length' else '퀴즈 맞춘 순'}")
-        st.write(st.session_state.display_words)
+        st.write(get_display_words())
 
     else:
         st.warning("불러올 단어가 없습니다. 'words.txt' 파일을 확인해주세요.")
+
+# --- 세션 메모리 현황 (사이드바) ---
+session_registry = track_session_memory()
+with session_registry['lock']:
+    session_count = len(session_registry['sessions'])
+    total_session_bytes = sum(info['state_bytes'] + info['derived_bytes'] for info in session_registry['sessions'].values())
+    current_entry = session_registry['sessions'].get(get_current_session_id())
+    current_session_bytes = current_entry['state_bytes'] + current_entry['derived_bytes'] if current_entry is not None else 0
+
+st.sidebar.subheader("세션 메모리")
+st.sidebar.metric("전체 세션 메모리", f"{total_session_bytes / (1024 * 1024):.2f} MB", help=f"활성 세션 {session_count}개 / 예산 {SESSION_MEMORY_BUDGET_MB:.0f} MB")
+st.sidebar.caption(f"현재 세션: {current_session_bytes / (1024 * 1024):.2f} MB · 유휴 {SESSION_IDLE_TIMEOUT_SECONDS}초 후 정리 · 공유 단어 캐시 최대 {WORD_CACHE_MAX_ENTRIES}개")